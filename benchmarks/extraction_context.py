@@ -0,0 +1,64 @@
+"""
+Compares the per-document extraction time with a fresh pdfminer context for every document (pdfminer's extract_pages,
+the default) and with one ExtractionContext shared by the whole batch (the shared_fonts option). The batch should be
+made of papers from the same venue. Fonts are only reused when the PDFs embed byte-identical font programs, subset
+fonts differ from one paper to the next.
+
+Run it from the root of the repository:
+    $ python benchmarks/extraction_context.py -in content/2022/ -n 20
+"""
+import argparse
+
+
+def init_arguments():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-in', '--input', help='A folder containing the PDF files of the batch',
+                        type=str, action='store', required=True)
+    parser.add_argument('-n', '--number', help='The maximum number of documents of the batch',
+                        type=int, default=20, action='store')
+    args = parser.parse_args()
+    return args
+
+
+def extract_batch(files, shared):
+    """
+    Extracts the text of every file and returns the time spent on each of them.
+
+    :param files: the paths of the PDF files.
+    :param shared: use one context for the whole batch, or pdfminer's extract_pages for every document.
+    :return: the list of times in seconds, the number of fonts reused and the number of fonts parsed (None without
+             shared context).
+    """
+    from time import perf_counter
+    from parsing.extraction import ExtractionContext
+    from parsing.parsers import extract_text_segment
+
+    context = ExtractionContext() if shared else None
+    timings = []
+    for file in files:
+        start = perf_counter()
+        extract_text_segment(file, context=context)
+        timings.append(perf_counter() - start)
+    if context is None:
+        return timings, None, None
+    return timings, context.resource_manager.hits, context.resource_manager.misses
+
+
+if __name__ == '__main__':
+    from os import listdir
+    from os.path import join
+    from statistics import mean
+    from sys import path
+
+    path.insert(0, '.')
+    args = init_arguments()
+    files = sorted(join(args.input, filename) for filename in listdir(args.input) if '.pdf' in filename)[:args.number]
+
+    print('{:<8} {:>10} {:>22} {:>12} {:>12}'.format('context', 'documents', 'mean per document (s)', 'font hits',
+                                                     'fonts parsed'))
+    for name, shared in [('fresh', False), ('shared', True)]:
+        timings, hits, misses = extract_batch(files, shared)
+        # the first document of the batch has nothing to reuse, the following ones show the saving
+        print('{:<8} {:>10} {:>22.3f} {:>12} {:>12}'.format(name, len(files), mean(timings[1:] or timings),
+                                                          '-' if hits is None else hits,
+                                                          '-' if misses is None else misses))
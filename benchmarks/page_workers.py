@@ -0,0 +1,116 @@
+"""
+Checks that extracting the pages of a document in chunks and stitching the segments back together (the page workers
+of the parser, -pw) gives exactly the text and styles of a single pass, and compares the time of both. Without input,
+a small PDF whose pages start with lone hyphens and line breaks is generated and every page boundary is checked.
+
+Run it from the root of the repository:
+    $ python benchmarks/page_workers.py
+    $ python benchmarks/page_workers.py -in content/2022/ -n 5 -c 10
+"""
+import argparse
+
+
+def init_arguments():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-in', '--input', help='A folder containing PDF files to check, a generated PDF when omitted',
+                        type=str, action='store')
+    parser.add_argument('-n', '--number', help='The maximum number of documents to check',
+                        type=int, default=5, action='store')
+    parser.add_argument('-c', '--chunk', help='The number of pages per chunk, every page boundary when omitted',
+                        type=int, action='store')
+    args = parser.parse_args()
+    return args
+
+
+def write_synthetic_pdf(filepath, pages):
+    """
+    Writes a minimal PDF with one line of Helvetica text per string.
+
+    :param filepath: the path of the PDF file to write.
+    :param pages: a list of pages, each one a list of lines.
+    """
+    objects = ['<< /Type /Catalog /Pages 2 0 R >>',
+               '<< /Type /Pages /Kids [{kids}] /Count {count} >>'.format(
+                   kids=' '.join('{id} 0 R'.format(id=4 + 2 * i) for i in range(len(pages))), count=len(pages)),
+               '<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>']
+    for i, lines in enumerate(pages):
+        stream = 'BT /F1 12 Tf 14 TL 72 720 Td ' + ' '.join('({line}) \''.format(line=line) for line in lines) + ' ET'
+        objects.append('<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Resources << /Font << /F1 3 0 R >> >> '
+                       '/Contents {id} 0 R >>'.format(id=5 + 2 * i))
+        objects.append('<< /Length {length} >>\nstream\n{stream}\nendstream'.format(length=len(stream), stream=stream))
+
+    content = '%PDF-1.4\n'
+    offsets = []
+    for i, obj in enumerate(objects):
+        offsets.append(len(content))
+        content += '{id} 0 obj\n{obj}\nendobj\n'.format(id=i + 1, obj=obj)
+    xref = len(content)
+    content += 'xref\n0 {size}\n0000000000 65535 f \n'.format(size=len(objects) + 1)
+    content += ''.join('{offset:010d} 00000 n \n'.format(offset=offset) for offset in offsets)
+    content += 'trailer\n<< /Size {size} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n'.format(size=len(objects) + 1,
+                                                                                          xref=xref)
+    with open(filepath, 'w') as f:
+        f.write(content)
+
+
+def check_document(filepath, chunk=None):
+    """
+    Extracts a document in a single pass and in chunks, and checks that both give the same text and styles.
+
+    :param filepath: the path of the PDF file.
+    :param chunk: the number of pages per chunk, None to check each page boundary with two chunks.
+    :return: the number of splits checked, the time of the single pass and the mean time of a split extraction.
+    """
+    from time import perf_counter
+    from pdfminer.pdfpage import PDFPage
+    from parsing.parsers import extract_text_segment, stitch_text_segments
+
+    with open(filepath, 'rb') as f:
+        pages = len(list(PDFPage.get_pages(f)))
+
+    start = perf_counter()
+    text, styles, _, _ = extract_text_segment(filepath)
+    single = perf_counter() - start
+
+    if chunk is None:
+        splits = [[range(0, boundary), range(boundary, pages)] for boundary in range(1, pages)]
+    else:
+        splits = [[range(first, min(first + chunk, pages)) for first in range(0, pages, chunk)]]
+    timings = []
+    for chunks in splits:
+        start = perf_counter()
+        segments = [extract_text_segment(filepath, page_numbers=pages, defer_leading=i > 0)
+                    for i, pages in enumerate(chunks)]
+        stitched_text, stitched_styles = stitch_text_segments(segments)
+        timings.append(perf_counter() - start)
+        assert stitched_text == text, 'different text when split at pages {chunks}'.format(
+            chunks=[pages.start for pages in chunks])
+        assert stitched_styles == styles, 'different styles when split at pages {chunks}'.format(
+            chunks=[pages.start for pages in chunks])
+    return len(splits), single, sum(timings) / len(timings) if timings else 0.
+
+
+if __name__ == '__main__':
+    from os import listdir
+    from os.path import join
+    from sys import path
+    from tempfile import TemporaryDirectory
+
+    path.insert(0, '.')
+    args = init_arguments()
+
+    with TemporaryDirectory() as directory:
+        if args.input is None:
+            # each page starts where a single pass has to look back at the end of the previous one
+            files = [join(directory, 'synthetic.pdf')]
+            write_synthetic_pdf(files[0], [['A first line that ends with a hyph-'], ['-', 'enated word.'],
+                                           ['-', '-', 'Lone hyphens at the start of the page-'],
+                                           ['--', 'Double hyphens.'], ['ending with a hyphen -'], ['-', 'end.']])
+        else:
+            files = sorted(join(args.input, filename) for filename in listdir(args.input)
+                           if '.pdf' in filename)[:args.number]
+
+        print('{:<40} {:>8} {:>16} {:>16}'.format('document', 'splits', 'single pass (s)', 'in chunks (s)'))
+        for file in files:
+            splits, single, chunked = check_document(file, args.chunk)
+            print('{:<40} {:>8} {:>16.3f} {:>16.3f}'.format(file[-40:], splits, single, chunked))
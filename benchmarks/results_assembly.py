@@ -0,0 +1,121 @@
+"""
+Compares the assembly and writing of the screening results: the former per paper x criterion pandas dataframes
+written to sentences.csv, and the columnar ScreeningResults written to sentences.parquet. The scores are synthetic,
+no model is loaded. The papers are generated one at a time, as they are screened, so the peak memory includes what
+each assembly keeps from the papers. With the similarity filter, only a few sentences of a paper are usually kept for
+each criterion, hence the low fraction measured by default next to a high one.
+
+Run it from the root of the repository:
+    $ python benchmarks/results_assembly.py -p 500 -k 0.2 0.01
+"""
+import argparse
+
+
+def init_arguments():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-p', '--papers', help='The number of synthetic papers',
+                        type=int, default=200, action='store')
+    parser.add_argument('-s', '--sentences', help='The number of sentences per paper',
+                        type=int, default=300, action='store')
+    parser.add_argument('-k', '--kept', help='The fractions of sentences kept by the similarity filter, one run each',
+                        type=float, nargs='+', default=[0.2, 0.01], action='store')
+    args = parser.parse_args()
+    return args
+
+
+def synthetic_results(papers, sentences, kept, criteria, labels):
+    import numpy as np
+
+    rng = np.random.default_rng(0)
+    for paper in range(papers):
+        title = 'paper_{}.pdf.json'.format(paper)
+        paper_sentences = ['Sentence {} of paper {} with a few more words in it.'.format(i, paper)
+                           for i in range(sentences)]
+        per_criterion = []
+        for key in criteria:
+            indices = np.flatnonzero(rng.random(sentences) < kept).tolist()
+            sim_scores = rng.random(len(indices)).tolist()
+            scores = [sorted(rng.random(len(labels[key])).tolist(), reverse=True) for _ in indices]
+            per_criterion.append((key, indices, sim_scores, scores))
+        yield title, paper_sentences, per_criterion
+
+
+def dataframe_assembly(data, criteria, labels, output):
+    """
+    The assembly formerly done by check_criteria.
+    """
+    from os.path import join
+    import pandas as pd
+
+    scores = []
+    predictions = []
+    for title, sentences, per_criterion in data:
+        paper_prediction = {}
+        for key, indices, sim_scores, label_scores in per_criterion:
+            sim_results = {'criteria': [key]*len(indices), 'sentences': [sentences[i] for i in indices],
+                           'sim_scores': sim_scores}
+            results = {'sequence': sim_results['sentences'], 'labels': [labels[key]]*len(indices),
+                       'scores': label_scores}
+            df_scores = pd.concat([pd.DataFrame(sim_results), pd.DataFrame(results)], axis=1)
+            df_scores['paper_title'] = [title]*len(df_scores)
+            df_scores['max_label_score'] = df_scores['scores'].apply(lambda x: x[0])
+            paper_prediction[key] = [int(any(df_scores['max_label_score'] > 0.78))]
+            scores.append(df_scores)
+        paper_prediction['paper_title'] = [title]
+        predictions.append(pd.DataFrame(paper_prediction))
+    final = pd.concat(scores)
+    pred = pd.concat(predictions)
+    pred.fillna(0, inplace=True)
+    pred.to_csv(join(output, "predictions.csv"))
+    final.to_csv(join(output, "sentences.csv"))
+
+
+def columnar_assembly(data, criteria, labels, output):
+    from screening.results import ScreeningResults
+
+    results = ScreeningResults(criteria)
+    for title, sentences, per_criterion in data:
+        paper_id = results.add_paper(title, sentences)
+        for criterion_id, (key, indices, sim_scores, label_scores) in enumerate(per_criterion):
+            results.add(paper_id, criterion_id, indices, sim_scores, [scores[0] for scores in label_scores],
+                        [labels[key][0]]*len(indices))
+    results.write(output, 0.78)
+
+
+def measure(function, *args):
+    """
+    :return: the wall-clock time in seconds and the peak of memory allocated by Python, in MB.
+    """
+    from time import perf_counter
+    import tracemalloc
+
+    tracemalloc.start()
+    start = perf_counter()
+    function(*args)
+    elapsed = perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 2**20
+
+
+if __name__ == '__main__':
+    from os import listdir
+    from os.path import getsize, join
+    from sys import path
+    from tempfile import TemporaryDirectory
+    from json import load
+
+    path.insert(0, '.')
+    args = init_arguments()
+    with open('util_files/criteria_groundtruth.json', 'r') as f:
+        labels = load(f)['zero_shot'][0]
+    criteria = list(labels)
+
+    print('{:<6} {:<12} {:>10} {:>14} {:>14}'.format('kept', 'assembly', 'time (s)', 'peak mem (MB)', 'output (MB)'))
+    for kept in args.kept:
+        for name, function in [('dataframes', dataframe_assembly), ('columnar', columnar_assembly)]:
+            data = synthetic_results(args.papers, args.sentences, kept, criteria, labels)
+            with TemporaryDirectory() as output:
+                elapsed, peak = measure(function, data, criteria, labels, output)
+                size = sum(getsize(join(output, filename)) for filename in listdir(output)) / 2**20
+            print('{:<6} {:<12} {:>10.2f} {:>14.1f} {:>14.1f}'.format(kept, name, elapsed, peak, size))
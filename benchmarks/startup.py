@@ -0,0 +1,60 @@
+"""
+Measures the startup time of the command line entry points, i.e. the time to print the help, which is what every
+invocation pays before doing any work. The import time of the heavy backends is reported for comparison, these are
+the modules that are only loaded when a command needs them.
+
+Run it from the root of the repository:
+    $ python benchmarks/startup.py -r 10
+"""
+import argparse
+
+
+def init_arguments():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-r', '--repeat', help='The number of times each command is run',
+                        type=int, default=5, action='store')
+    args = parser.parse_args()
+    return args
+
+
+def time_command(command, repeat):
+    """
+    Runs a command several times and returns its median wall-clock time.
+
+    :param command: the command as a list of arguments.
+    :param repeat: the number of runs.
+    :return: the median time in seconds, or None if the command failed.
+    """
+    from statistics import median
+    from subprocess import run, DEVNULL
+    from time import perf_counter
+
+    timings = []
+    for _ in range(repeat):
+        start = perf_counter()
+        completed = run(command, stdout=DEVNULL, stderr=DEVNULL)
+        timings.append(perf_counter() - start)
+        if completed.returncode != 0:
+            return None
+    return median(timings)
+
+
+if __name__ == '__main__':
+    from sys import executable
+
+    args = init_arguments()
+    commands = [
+        ('python (interpreter only)', [executable, '-c', 'pass']),
+        ('replica.py --help', [executable, 'replica.py', '--help']),
+        ('replica.py screen --help', [executable, 'replica.py', 'screen', '--help']),
+        ('replica.py run --help', [executable, 'replica.py', 'run', '--help']),
+        ('criteria_screener.py --help', [executable, 'criteria_screener.py', '--help']),
+        ('parser.py --help', [executable, 'parser.py', '--help']),
+    ]
+    for module in ['numpy', 'pandas', 'nltk', 'pdfminer.high_level', 'bert_score', 'transformers']:
+        commands.append(('import {module}'.format(module=module), [executable, '-c', 'import ' + module]))
+
+    print('{:<32} {:>12}'.format('command', 'median (s)'))
+    for name, command in commands:
+        timing = time_command(command, args.repeat)
+        print('{:<32} {:>12}'.format(name, 'failed' if timing is None else '{:.3f}'.format(timing)))
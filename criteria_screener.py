@@ -1,14 +1,15 @@
 from json import load
 from os.path import isdir, basename, join
-from os import listdir, makedirs
-
-import numpy as np
-import pandas as pd
-from bert_score import BERTScorer
-from transformers import pipeline
+from os import listdir
 
 import argparse
 
+# bert_score, transformers and the numpy/pandas based modules are imported where they are used, loading them
+# (torch in particular) takes seconds and is not needed to print the help or to screen without one of the models
+
+# entailment probability threshold was empirically determined to be 0.78
+THRESHOLD_PROB = 0.78
+
 
 def init_arguments():
     parser = argparse.ArgumentParser()
@@ -20,6 +21,8 @@ def init_arguments():
                          default=True, action='store_false')
     parser.add_argument('-nc', '--no_classifier', help='Disables zero-shot text classifier',
                         default=True, action='store_false')
+    parser.add_argument('-st', '--student', help='Screens with this distilled student model instead of the '
+                                                 + 'similarity filter and zero-shot classifier', type=str, action='store')
     args = parser.parse_args()
     return args
 
@@ -45,27 +48,66 @@ def json_to_sent(json_file):
     :return: `sentences` (list of str): list of sentences from the PDF 
     """
 
-    from nltk.tokenize import sent_tokenize
-
     with open(json_file, 'r') as f:
         data = load(f)
+    return data_to_sent(data)
+
+
+def data_to_sent(data):
+    """
+    Converts a parsed document dict to list of sentences with greater than two words
+
+    :param: `data` (dict): the dict representation of a parsed document, as written by the PDF parser
+
+    :return: `sentences` (list of str): list of sentences from the PDF
+    """
+    sections = [(para['title']['content'], [sent['content'] for sent in para['sentences']])
+                for para in data['content']]
+    return sections_to_sent(sections)
+
+
+def document_to_sent(document):
+    """
+    Converts an in-memory parsed document to list of sentences with greater than two words, without going through
+    its json representation
+
+    :param: `document` (Document): the document returned by the PDF parser
+
+    :return: `sentences` (list of str): list of sentences from the PDF
+    """
+    sections = [(section.get_title().get_content(), [sent.get_content() for sent in section.get_sentences()])
+                for section in document.get_content()]
+    return sections_to_sent(sections)
+
+
+def sections_to_sent(sections):
+    """
+    Splits the content of the sections of a parsed document into sentences with greater than two words
+
+    :param: `sections` (list of tuples): the title content and the list of sentence contents of every section
+
+    :return: `sentences` (list of str): list of sentences from the PDF
+    """
+
+    from nltk.tokenize import sent_tokenize
+
     sentences = []
-    for para in data['content']:
-        for sent in para['sentences']:
-            for sentence in sent_tokenize(sent['content']):
+    for _, contents in sections:
+        for content in contents:
+            for sentence in sent_tokenize(content):
                 if len(sentence.split(' ')) > 2: 
                     sentences.append(sentence)
     # some of the json generated only few sentences (here assumed < 100) in the sentence nodes, hence checking title nodes
     if len(sentences)<100:
         print ("Empty sentence, checking title nodes:", sentences)
-        for para in data['content']:
-            for sentence in sent_tokenize(para['title']['content']):
+        for title, _ in sections:
+            for sentence in sent_tokenize(title):
                 if len(sentence.split(' ')) > 2: 
                     sentences.append(sentence)
 
     return sentences
 
-def classify_criteria(classifier, sentences, criteria):
+def classify_criteria(classifier, sentences, criteria, batch_size=1):
     """
     NLI based zero-shot classification which calculates the *entailment* probability between sentences and criteria 
     template sentence "this is an example of <keyword>"
@@ -73,52 +115,95 @@ def classify_criteria(classifier, sentences, criteria):
     :param: `classifier` (obj): NLI-based zero-shot classification pipeline object
     :param: `sentences` (list of string): list of sentences 
     :param: `criteria` (list of string): list of keywords for the criterion considered as candidate labels
+    :param: `batch_size` (int): the number of (sentence, keyword) pairs going through the NLI model together
 
     :return: `results` (dict): a dict with the following keys:
             - **sequence** (`str`) -- the sequence for which this is the output
             - **labels** (`List[str]`) -- the keywords or labels sorted by order of likelihood
             - **scores** (`List[float]`) -- the probabilities for each of the keywords 
     """
-    results = classifier(sentences, criteria, multi_label=True)
+    results = classifier(sentences, criteria, multi_label=True, batch_size=batch_size)
     return results
      
-def calculate_sim_scores(scorer, sentences, groundtruth, threshold, criteria):
+def load_models(use_sim_score=True, use_zero_shot_classifier=True):
     """
-    Calculates the BERTscore of similarity between the paper sentences and reference sentences
+    Loads the reference sentences, the thresholds and (optionally) the similarity scorer and zero-shot classifier
 
-    :param: `scorer` (obj): BERTScorer object 
-    :param: `sentences` (list of string): list of sentences from the PDF
-    :param: `groundtruth` (list of string): list of reference sentences for the criterion
-    :param: `threshold` (float): threshold score for the criterion
-    :param: `criteria` (str): the criterion
+    :param: `use_sim_score` (bool): a boolean specifying whether to load the BERTScorer or not
+    :param: `use_zero_shot_classifier` (bool): a boolean specifying whether to load the zero-shot classifier or not
 
-    :return: `results` (dict): a dict containing the criterion, sentences whose similarity scores are higher than the 
-                                threshold and their respective scores
+    :return: `groundtruth` (dict), `threshold` (dict), `scorer` (obj or None), `classifier` (obj or None)
     """
-    p, r, f = scorer.score(sentences, [groundtruth]*len(sentences))
-    mask = f > threshold
-    indices = mask.nonzero().flatten().numpy()
-    results = {'criteria': [criteria]*len(indices), 'sentences': list(np.array(sentences)[indices]), 'sim_scores': f[indices]}
-    return results
+    if use_sim_score: from bert_score import BERTScorer
+    if use_zero_shot_classifier: from transformers import pipeline
+
+    # read the reference sentences
+    groundtruth = read_json("util_files/criteria_groundtruth.json")
+    # read the threshold scores for similarity filter, different for each criteria
+    threshold = read_json("util_files/threshold_scores.json")
+
+    # list of sentences used to compute the idf weights, providing all reference sentences for all criteria to keep it simple
+    all_gt = []
+    for key in groundtruth['sim_matcher'][0]: all_gt.extend(groundtruth["sim_matcher"][0][key])
 
+    scorer = None
+    classifier = None
+    if use_sim_score: scorer = BERTScorer(model_type="distilbert-base-uncased", idf=True, idf_sents=all_gt)
+    if use_zero_shot_classifier: classifier = pipeline("zero-shot-classification")
+    return groundtruth, threshold, scorer, classifier
 
-def check_criteria(filepath, use_sim_score = True, use_zero_shot_classifier = True):
+
+def score_criterion(sentences, key, groundtruth, threshold, scorer=None, classifier=None, batch_size=1):
+    """
+    Runs the similarity filter and the zero-shot classifier (whichever are given) for one criterion over a batch of
+    sentences, which may come from several papers
+
+    :param: `sentences` (list of string): list of sentences to check
+    :param: `key` (str): the criterion
+    :param: `groundtruth` (dict): the reference sentences and labels, as read from criteria_groundtruth.json
+    :param: `threshold` (dict): the similarity thresholds, as read from threshold_scores.json
+    :param: `scorer` (obj): BERTScorer object, or None to disable the similarity filter
+    :param: `classifier` (obj): NLI-based zero-shot classification pipeline object, or None to disable it
+    :param: `batch_size` (int): the batch size of the zero-shot classifier
+
+    :return: `indices` (list of int), `sim_scores` (list of float), `max_label_scores` (list of float),
+             `top_labels` (list of str or None): the positions in `sentences` kept by the similarity filter, their
+             similarity scores, the score compared against THRESHOLD_PROB (the top entailment probability, or the
+             similarity score without classifier) and the most likely label (None without classifier)
+    """
+    if scorer is not None and len(sentences) > 0:
+        p, r, f = scorer.score(sentences, [groundtruth["sim_matcher"][0][key]]*len(sentences))
+        indices = (f > threshold["zero_shot"][0][key]).nonzero().flatten().tolist()
+        sim_scores = f[indices].tolist()
+    else:
+        indices = list(range(len(sentences)))
+        sim_scores = [0.]*len(sentences)
+
+    if classifier is None:
+        return indices, sim_scores, sim_scores, None
+    if len(indices) == 0:
+        return indices, sim_scores, [], []
+    results = classify_criteria(classifier, [sentences[i] for i in indices], groundtruth['zero_shot'][0][key],
+                                batch_size=batch_size)
+    # the pipeline returns a single dict instead of a list when given a single sentence
+    if isinstance(results, dict):
+        results = [results]
+    return indices, sim_scores, [result['scores'][0] for result in results], [result['labels'][0] for result in results]
+
+
+def check_criteria(filepath, use_sim_score = True, use_zero_shot_classifier = True, output = 'output', student = None):
     """
     Calls (optionally) the modules of similarity score filter and zero-shot classifier to check criteria satisfaction 
 
     :param: `filepath` (str): path to the folder containing the outputs of the PDF parser or a json output file
     :param: `use_sim_score` (bool): a boolean specifying whether to use similarity score filter or not
     :param: `use_zero_shot_classifier` (bool): a boolean specifying whether to use zero-shot classifier or not
+    :param: `output` (str): the folder where the results are written
+    :param: `student` (str): path to a distilled student model (see screening/student.py) used instead of the
+                             similarity filter and zero-shot classifier
 
-    Writes output to two .csv files -
-    - sentences.csv with columns criteria, sentence, similarity score, labels, probability scores, paper title, max probability score
-    - predictions.csv with one column for each criteria and paper title
+    Writes output to two files, see screen_papers
     """
-
-    assert (
-            use_sim_score is not False or use_zero_shot_classifier is not False
-        ), "Either of use_sim_score or use_zero_shot_classifier should be True"
-
     files = []
     
     if isdir(filepath):
@@ -127,68 +212,67 @@ def check_criteria(filepath, use_sim_score = True, use_zero_shot_classifier = Tr
         files.append(filepath)
     else:
         exit(1)
-    
-    # read the reference sentences
-    groundtruth = read_json("util_files/criteria_groundtruth.json")  
 
-    # list of sentences used to compute the idf weights, providing all reference sentences for all criteria to keep it simple
-    all_gt = []
-    for key in groundtruth['sim_matcher'][0]: all_gt.extend(groundtruth["sim_matcher"][0][key])
-    
-    if use_sim_score: scorer = BERTScorer(model_type="distilbert-base-uncased", idf=True, idf_sents=all_gt)
-    if use_zero_shot_classifier: classifier = pipeline("zero-shot-classification")
-    
-    # read the threshold scores for similarity filter, different for each criteria
-    threshold = read_json("util_files/threshold_scores.json")
-    
-    scores = []
-    predictions = []
-    # entailment probability threshold was empirically determined to be 0.78
-    threshold_prob = 0.78
-    
-    for json_file in files:
-        print('####\nProcessing article {}\n'.format(basename(json_file))) 
-        sentences = json_to_sent(json_file)
+    papers = ((basename(json_file), json_to_sent(json_file)) for json_file in files)
+    screen_papers(papers, use_sim_score=use_sim_score, use_zero_shot_classifier=use_zero_shot_classifier,
+                  output=output, student=student)
+
+
+def screen_papers(papers, use_sim_score = True, use_zero_shot_classifier = True, output = 'output', student = None):
+    """
+    Checks criteria satisfaction for papers given as (title, sentences) pairs
 
-        paper_prediction = {}
-        for key in groundtruth["zero_shot"][0]:
+    :param: `papers` (iterable of tuples): the title and the list of sentences of every paper
+    :param: `use_sim_score` (bool): a boolean specifying whether to use similarity score filter or not
+    :param: `use_zero_shot_classifier` (bool): a boolean specifying whether to use zero-shot classifier or not
+    :param: `output` (str): the folder where the results are written
+    :param: `student` (str): path to a distilled student model (see screening/student.py) used instead of the
+                             similarity filter and zero-shot classifier
+
+    Writes output to two files -
+    - sentences.parquet with columns criteria, sentence, similarity score, top label, paper title, max probability score
+      (the strings are stored as categorical columns)
+    - predictions.csv with one column for each criteria and paper title
+    """
+
+    from screening.results import ScreeningResults
+
+    if student is not None:
+        from screening.student import StudentClassifier
+        model = StudentClassifier.load(student)
+        criteria = model.criteria
+        # one probability threshold per criterion, tuned when distilling the student
+        threshold_prob = model.thresholds
+    else:
+        assert (
+                use_sim_score is not False or use_zero_shot_classifier is not False
+            ), "Either of use_sim_score or use_zero_shot_classifier should be True"
+        groundtruth, threshold, scorer, classifier = load_models(use_sim_score, use_zero_shot_classifier)
+        criteria = list(groundtruth["zero_shot"][0])
+        threshold_prob = THRESHOLD_PROB
+
+    results = ScreeningResults(criteria)
+    for title, sentences in papers:
+        print('####\nProcessing article {}\n'.format(title)) 
+        paper_id = results.add_paper(title, sentences)
+
+        if student is not None:
+            # a single forward pass per sentence gives the probabilities of all the criteria, only the sentences
+            # crossing the threshold of a criterion are stored as its evidence
+            probabilities = model.predict_proba(sentences)
+            for criterion_id in range(len(criteria)):
+                results.add(paper_id, criterion_id, range(len(sentences)), 0., probabilities[:, criterion_id],
+                            min_score=threshold_prob[criterion_id])
+            continue
+
+        for criterion_id, key in enumerate(criteria):
             print('Checking criteria {}\n----'.format(key))
+            indices, sim_scores, max_label_scores, top_labels = score_criterion(sentences, key, groundtruth, threshold,
+                                                                                scorer=scorer, classifier=classifier)
+            results.add(paper_id, criterion_id, indices, sim_scores, max_label_scores, top_labels)
 
-            if use_sim_score:
-                sim_results = calculate_sim_scores(scorer, sentences, groundtruth["sim_matcher"][0][key], threshold["zero_shot"][0][key], key)
-            else:
-                sim_results = {'criteria': [key]*len(sentences), 'sentences': sentences, 'sim_scores': [0]*len(sentences)}
-
-
-            if use_zero_shot_classifier:
-                if len(sim_results['sentences'])>0:
-                    results = classify_criteria(classifier, sim_results['sentences'], groundtruth['zero_shot'][0][key])
-                else: results = {'sequence': [], 'labels': [], 'scores': []}
-                # concatenating the results from similarity filter and classifier in a dataframe
-                df_scores = pd.concat([pd.DataFrame(sim_results), pd.DataFrame(results)], axis=1)
-                df_scores['paper_title'] = [basename(json_file)]*len(df_scores)
-                df_scores['max_label_score'] = df_scores['scores'].apply(lambda x:x[0])
-            else:
-                df_scores = pd.DataFrame(sim_results)
-                df_scores = df_scores.rename(columns={'sim_scores':'max_label_score'})
-                
-            # if any of the sentence crosses the threshold probability, prediction is marked as 1 for that paper title and criteria
-            paper_prediction[key] = [int(any(df_scores['max_label_score'] > threshold_prob))]
-            scores.append(df_scores)
-       
-        paper_prediction['paper_title'] = [basename(json_file)]
-        predictions.append(pd.DataFrame(paper_prediction))
-
-    final = pd.concat(scores)
-    pred = pd.concat(predictions)
-    pred.fillna(0, inplace=True)
-
-    if args.output is not None:
-        if not isdir(args.output):
-            makedirs(args.output)
-
-    pred.to_csv(join(args.output, "predictions.csv"))
-    final.to_csv(join(args.output, "sentences.csv"))
+    # if any of the sentence crosses the threshold probability, prediction is marked as 1 for that paper title and criteria
+    results.write(output, threshold_prob)
 
 
 if __name__ == '__main__':
@@ -197,4 +281,5 @@ if __name__ == '__main__':
         print('\nPath to the PDF parsed files must be specified.... \n\n')
         exit(1)
 
-    check_criteria(filepath=args.filepath, use_sim_score=args.no_similarity, use_zero_shot_classifier=args.no_classifier)
+    check_criteria(filepath=args.filepath, use_sim_score=args.no_similarity, use_zero_shot_classifier=args.no_classifier,
+                   output=args.output, student=args.student)
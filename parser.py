@@ -15,11 +15,20 @@ def init_arguments():
                         default=False, action='store_true')
     parser.add_argument('-nc', '--no-check', help='Prevents end check process from running',
                         dest='check', default=True, action='store_false')
+    parser.add_argument('-pw', '--page_workers', help='The number of processes extracting the pages of each document, '
+                                                      + 'useful for very large PDFs', type=int, default=1,
+                        action='store')
+    parser.add_argument('-sf', '--shared_fonts', help='Reuse the fonts parsed in the previous documents, only useful '
+                                                      + 'when the PDFs embed identical (not subset) fonts',
+                        default=False, action='store_true')
+    parser.add_argument('-mp', '--min_pages', help='Documents with fewer pages are not split between the page workers',
+                        type=int, default=50, action='store')
     args = parser.parse_args()
     return args
 
 
-def start_parsing(filepath, mapfile, verbose=False):
+def start_parsing(filepath, mapfile, verbose=False, page_workers=1, min_pages=50, shared_fonts=False):
+    from concurrent.futures import ProcessPoolExecutor
     from os.path import isdir
     from os import listdir
     from parsing.parsers import DocumentParser
@@ -43,12 +52,19 @@ def start_parsing(filepath, mapfile, verbose=False):
 
     documents = []
     parsers = []
-    with ChargingBar('Parsing', max=len(files), suffix='%(index)d/%(max)d %(percent)d%%') as progress_bar:
-        for file in files:
-            parser = DocumentParser(file, map)
-            documents.append(parser.parse(verbose=verbose))
-            parsers.append(parser)
-            progress_bar.next()
+    # the page workers are started once and shared by all the documents
+    executor = ProcessPoolExecutor(max_workers=page_workers) if page_workers > 1 else None
+    try:
+        with ChargingBar('Parsing', max=len(files), suffix='%(index)d/%(max)d %(percent)d%%') as progress_bar:
+            for file in files:
+                parser = DocumentParser(file, map, page_workers=page_workers, min_pages=min_pages, executor=executor,
+                                        shared_fonts=shared_fonts)
+                documents.append(parser.parse(verbose=verbose))
+                parsers.append(parser)
+                progress_bar.next()
+    finally:
+        if executor is not None:
+            executor.shutdown()
 
     return documents, parsers
 
@@ -101,6 +117,7 @@ def __correct_map(parsers, mapfile, reference_word='ABSTRACT', type='title'):
 
 
 def start_correction_process(input_filepath, mapfile, documents, parsers):
+    from json import dump
     from progress.bar import ChargingBar
     file_errors, parser_errors = __check_results(documents, parsers)
     print('Found {issues} issues in the current parsing batch'.format(issues=len(file_errors)))
@@ -142,7 +159,8 @@ if __name__ == '__main__':
     if args.input is None:
         print('Please specify an input file with the --input parameter.')
         exit(1)
-    documents, parsers = start_parsing(args.input, args.map, args.verbose)
+    documents, parsers = start_parsing(args.input, args.map, args.verbose, args.page_workers,
+                                       args.min_pages, args.shared_fonts)
     map = args.map
     correct = args.check
     while correct:
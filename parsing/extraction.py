@@ -0,0 +1,244 @@
+from collections import OrderedDict
+
+from pdfminer.pdfinterp import PDFResourceManager
+
+
+class SharedResourceManager(PDFResourceManager):
+    """
+    This class represents a pdfminer resource manager meant to outlive a document. pdfminer caches the fonts by object
+    id, which is only meaningful inside one document, so this manager also keeps the fonts in a bounded LRU cache keyed
+    by their content (the resolved font dictionary and a digest of the embedded font program). Documents embedding the
+    same fonts then reuse the parsed fonts instead of parsing them again. Fonts embedded as subsets, with a different
+    subset in every document, never match: computing their key is then an overhead.
+
+    The fonts kept are detached from their document (references resolved, streams dropped) so that the cache does
+    not keep the previous documents in memory.
+
+    Attributes
+    ----------
+
+    max_fonts: int
+        the maximum number of fonts kept across documents.
+    hits: int
+        the number of fonts found in the cache of a previous document.
+    misses: int
+        the number of fonts created.
+
+    Methods
+    _______
+
+    begin_document()
+        Forgets the object ids of the previous document, to be called before processing a new document.
+    end_document()
+        Forgets the object ids of the document, to be called once it has been processed.
+    get_font(objid, spec)
+        Returns the font described by spec, from the caches when possible.
+    """
+
+    # the fingerprint and the detached copy of a font follow the references of its dictionary up to this depth
+    MAX_FINGERPRINT_DEPTH = 8
+
+    def __init__(self, max_fonts=256):
+        """
+        :param max_fonts: the maximum number of fonts kept across documents.
+        """
+        super(SharedResourceManager, self).__init__(caching=True)
+        self.max_fonts = max_fonts
+        self.hits = 0
+        self.misses = 0
+        self._shared_fonts = OrderedDict()
+
+    def begin_document(self):
+        """
+        Forgets the fonts cached by object id, these ids are only valid in the previous document.
+        """
+        self._cached_fonts = {}
+
+    def end_document(self):
+        """
+        Forgets the fonts cached by object id, the ones that cannot be shared still refer to the document.
+        """
+        self._cached_fonts = {}
+
+    def get_font(self, objid, spec):
+        """
+        Returns the font described by spec. The font is looked up by object id in the current document, then by content
+        in the fonts of the previous documents, and created by pdfminer otherwise.
+
+        :param objid: the object id of the font in the current document, or None.
+        :param spec: the font dictionary.
+        :return: an instance of pdfminer's PDFFont.
+        """
+        if objid and objid in self._cached_fonts:
+            return self._cached_fonts[objid]
+
+        key = self.font_key(spec)
+        if key is not None and key in self._shared_fonts:
+            self._shared_fonts.move_to_end(key)
+            font = self._shared_fonts[key]
+            self.hits += 1
+        else:
+            # without objid pdfminer neither looks up nor stores the font in its own cache
+            font = super(SharedResourceManager, self).get_font(None, spec)
+            self.misses += 1
+            if key is not None:
+                self._detach(font)
+                self._shared_fonts[key] = font
+                if len(self._shared_fonts) > self.max_fonts:
+                    self._shared_fonts.popitem(last=False)
+        if objid:
+            self._cached_fonts[objid] = font
+        return font
+
+    def font_key(self, spec):
+        """
+        Computes a key identifying the content of a font across documents.
+
+        :param spec: the font dictionary.
+        :return: a digest of the font dictionary with its references resolved, or None if the font cannot be shared.
+        """
+        from hashlib import sha1
+        from pdfminer.psparser import literal_name
+
+        # Type3 glyphs are content streams drawn with the resources of their document, they are not shared
+        if 'Subtype' in spec and literal_name(spec['Subtype']) == 'Type3':
+            return None
+        digest = sha1()
+        try:
+            self._fingerprint(spec, digest, 0)
+        except RecursionError:
+            return None
+        return digest.digest()
+
+    def _detach(self, font):
+        """
+        Replaces, in the attributes of a font, the references to the objects of its document by their values and drops
+        the streams (the embedded font programs, only read when the font is created).
+
+        :param font: the PDFFont to detach from its document.
+        """
+        for name, value in list(vars(font).items()):
+            setattr(font, name, self._detached(value, 0))
+
+    def _detached(self, value, depth):
+        from pdfminer.pdftypes import PDFObjRef, PDFStream
+
+        if isinstance(value, PDFObjRef):
+            return self._detached(value.resolve(), depth + 1) if depth < self.MAX_FINGERPRINT_DEPTH else None
+        elif isinstance(value, PDFStream):
+            return None
+        elif isinstance(value, dict):
+            return {k: self._detached(v, depth + 1) for k, v in value.items()}
+        elif isinstance(value, list):
+            return [self._detached(v, depth + 1) for v in value]
+        elif isinstance(value, tuple):
+            return tuple(self._detached(v, depth + 1) for v in value)
+        return value
+
+    def _fingerprint(self, value, digest, depth):
+        from pdfminer.pdftypes import PDFObjRef, PDFStream
+        from pdfminer.psparser import PSLiteral, PSKeyword
+
+        if depth > self.MAX_FINGERPRINT_DEPTH:
+            raise RecursionError('font dictionary too deep to fingerprint')
+        if isinstance(value, PDFObjRef):
+            self._fingerprint(value.resolve(), digest, depth + 1)
+        elif isinstance(value, dict):
+            digest.update(b'<<')
+            for k in sorted(value):
+                digest.update(str(k).encode('utf8', 'replace'))
+                self._fingerprint(value[k], digest, depth + 1)
+            digest.update(b'>>')
+        elif isinstance(value, (list, tuple)):
+            digest.update(b'[')
+            for v in value:
+                self._fingerprint(v, digest, depth + 1)
+            digest.update(b']')
+        elif isinstance(value, PDFStream):
+            digest.update(b'stream')
+            self._fingerprint(value.attrs, digest, depth + 1)
+            # hashing the raw (still compressed) bytes is much cheaper than decoding and parsing the font program
+            data = value.get_rawdata()
+            digest.update(data if data is not None else value.get_data())
+        elif isinstance(value, PSLiteral):
+            digest.update(b'/' + str(value.name).encode('utf8', 'replace'))
+        elif isinstance(value, PSKeyword):
+            digest.update(b'!' + bytes(value.name))
+        elif isinstance(value, bytes):
+            digest.update(b'(' + value + b')')
+        else:
+            digest.update(repr(value).encode('utf8', 'replace'))
+        digest.update(b',')
+
+
+class ExtractionContext:
+    """
+    This class represents a long-lived pdfminer extraction context: the resource manager, with its font caches, and the
+    layout parameters are kept from one document to the next. It replaces pdfminer's extract_pages, which starts from
+    fresh caches for every document.
+
+    Attributes
+    ----------
+
+    resource_manager: SharedResourceManager
+        the resource manager shared by the documents.
+    laparams: LAParams
+        the layout analysis parameters.
+
+    Methods
+    _______
+
+    extract_pages(document, page_numbers=None)
+        Extracts the layout of the pages of a document, one page at a time.
+    """
+
+    def __init__(self, max_fonts=256, laparams=None):
+        """
+        :param max_fonts: the maximum number of fonts kept across documents.
+        :param laparams: the layout analysis parameters, pdfminer's defaults when None.
+        """
+        from pdfminer.layout import LAParams
+
+        self.resource_manager = SharedResourceManager(max_fonts=max_fonts)
+        self.laparams = laparams if laparams is not None else LAParams()
+
+    def extract_pages(self, document, page_numbers=None):
+        """
+        Extracts the layout of the pages of a document. The pages of a document must be consumed before starting
+        the next document in the same context.
+
+        :param document: the path to the PDF document.
+        :param page_numbers: the (zero-based) numbers of the pages to extract, all of them when None.
+        :return: a generator of pdfminer LTPage objects.
+        """
+        from pdfminer.converter import PDFPageAggregator
+        from pdfminer.pdfinterp import PDFPageInterpreter
+        from pdfminer.pdfpage import PDFPage
+
+        with open(document, 'rb') as fp:
+            self.resource_manager.begin_document()
+            try:
+                device = PDFPageAggregator(self.resource_manager, laparams=self.laparams)
+                interpreter = PDFPageInterpreter(self.resource_manager, device)
+                for page in PDFPage.get_pages(fp, page_numbers, caching=True):
+                    interpreter.process_page(page)
+                    yield device.get_result()
+            finally:
+                self.resource_manager.end_document()
+
+
+_worker_context = None
+
+
+def worker_context():
+    """
+    Returns the extraction context of the current process, created on the first call. Every process extracting with
+    shared fonts (see the shared_fonts option of DocumentParser) thus keeps its own caches across the documents and
+    chunks it extracts, the page workers of a batch living as long as the batch.
+
+    :return: the ExtractionContext of the process.
+    """
+    global _worker_context
+    if _worker_context is None:
+        _worker_context = ExtractionContext()
+    return _worker_context
@@ -13,12 +13,24 @@ class DocumentParser:
         the path to the PDF document to parse.
     map: str
         the path to the JSON map to use in order to detect the specific titles according to the font used.
+    page_workers: int
+        the number of processes extracting the pages of the document.
+    pages_per_chunk: int
+        the number of pages given to a worker at once.
+    min_pages: int
+        the number of pages from which a document is split between the page workers.
+    executor: concurrent.futures.Executor
+        the pool of page workers, shared by the documents of a batch.
+    shared_fonts: bool
+        reuse the fonts parsed in the previous documents extracted by the same process.
 
     Methods
     _______
 
     parse(verbose=False)
         Parses the document and returns a Document class containing the sections, sentences and titles.
+    pdf_to_text(verbose=False)
+        Extracts the text of the document and the styles used in it, chunk by chunk if there are several page workers.
     """
     from enum import Enum
 
@@ -52,6 +64,9 @@ class DocumentParser:
         0xfb04: 'ffl',
     }
 
+    # A chunk of pages smaller than this is not worth reopening and parsing the PDF in another process
+    MIN_PAGES_PER_CHUNK = 10
+
     # This is what defines the end of the sentence, additionally, we test that the next character is uppercase
     LINE_END_TOKEN = '\. [A-Z]'
     POTENTIAL_END_TOKEN = '.' # detecting this will make the parser go into ParserState.LINE_END
@@ -61,74 +76,83 @@ class DocumentParser:
     cached_styles = []
     cached_line = ''
 
-    def __init__(self, document, map):
+    def __init__(self, document, map, page_workers=1, pages_per_chunk=None, min_pages=50, executor=None,
+                 shared_fonts=False):
         """
         :param document: the path to the PDF document to parse.
         :param map: the path to the JSON map to use in order to detect the specific titles according to the font used.
+        :param page_workers: the number of processes extracting the pages of the document, 1 extracts them in order
+        in the current process.
+        :param pages_per_chunk: the number of pages given to a worker at once, by default the pages are split in
+        twice as many chunks as there are workers, of at least MIN_PAGES_PER_CHUNK pages.
+        :param min_pages: documents with fewer pages are extracted in a single pass, in the current process.
+        :param executor: the pool of page_workers processes to use, shared by the documents of a batch. When None, a
+        pool is started for the document.
+        :param shared_fonts: reuse the fonts parsed in the previous documents extracted by the same process (see
+        parsing/extraction.py), only useful when the documents embed identical (not subset) fonts.
         """
         self.document = document
         self.map = map
+        self.page_workers = page_workers
+        self.pages_per_chunk = pages_per_chunk
+        self.min_pages = min_pages
+        self.executor = executor
+        self.shared_fonts = shared_fonts
         self.current_state = self.ParserState.NULL
 
     def pdf_to_text(self, verbose=False):
-        from os.path import basename
-        from pdfminer.high_level import extract_pages
-        from pdfminer.layout import LTTextBoxHorizontal, LTTextLine, LTChar
-        from parsing.objects import Section, Sentence, Title, Document
+        """
+        Extracts the text of the document and the styles used in it. When the parser has several page workers and the
+        document has at least min_pages pages, the pages are split in chunks extracted by separate processes and
+        stitched back together.
 
-        pages = extract_pages(self.document)
-        line_buffer = ''
-        styles_stack = []
-        current_style = None
-        char_counter = 0
-        for page in pages:  # Hope you like indented code
-            for container in page:
-                if isinstance(container, LTTextBoxHorizontal):
-                    for line in container:
-                        if isinstance(line, LTTextLine):
-                            for char in line:
-                                if isinstance(char, LTChar):
-                                    token = char.get_text().replace('\xa0', '').replace('\xad', '')
-                                    if token in self.SUPPORTED_LIGATURES.keys():
-                                        token = token.translate(self.SUPPORTED_LIGATURES)
-                                        char_counter += 1
-                                    if current_style is None:
-                                        current_style = {}
-                                    if 'name' not in current_style.keys():
-                                        current_style['name'] = char.fontname
-                                        current_style['start'] = char_counter
-                                    elif char.fontname != current_style['name'] and token != ' ':
-                                        current_style['end'] = char_counter
-                                        if verbose:
-                                            print(line_buffer[current_style['start']:current_style['end']],
-                                                  current_style)
-                                        styles_stack.append(current_style)
-                                        current_style = {'name': char.fontname, 'start': char_counter}
-                                    if len(token) > 0:
-                                        line_buffer += token
-                                        char_counter += 1
-                                elif isinstance(char, LTAnno):
-                                    token = char.get_text().replace('\xa0', '').replace('\xad', '')
-                                    if token in self.SUPPORTED_LIGATURES.keys():
-                                        token = token.translate(self.SUPPORTED_LIGATURES)
-                                        char_counter += 1
-                                    if token == ' ' and line_buffer[-1:] != ' ':
-                                        line_buffer += ' '
-                                        char_counter += 1
-                                    elif token == '\n':
-                                        if len(line_buffer) > 1 and line_buffer[-1:] == '-':
-                                            line_buffer = line_buffer.rstrip(line_buffer[-1]) + ' '
-                                        elif line_buffer[-1:] != ' ':
-                                            line_buffer += ' '
-                                            char_counter += 1
-                    current_style['end'] = char_counter
-                    if verbose:
-                        print(line_buffer[current_style['start']:current_style['end']],
-                              current_style)
-                    styles_stack.append(current_style)
-                    current_style = None
+        :param verbose: print additional process information or not.
+        :return: the text of the document and the list of styles with their start and end offsets in the text.
+        """
+        if self.page_workers > 1:
+            chunks = self.page_chunks()
+            if len(chunks) > 1:
+                from concurrent.futures import ProcessPoolExecutor
+                from itertools import repeat
+
+                executor = self.executor
+                if executor is None:
+                    executor = ProcessPoolExecutor(max_workers=self.page_workers)
+                try:
+                    segments = executor.map(extract_text_segment, repeat(self.document), chunks, repeat(verbose),
+                                            repeat(True), repeat(self.shared_fonts))
+                    return stitch_text_segments(segments)
+                finally:
+                    if self.executor is None:
+                        executor.shutdown()
+
+        line_buffer, styles_stack, _, _ = extract_text_segment(self.document, verbose=verbose,
+                                                               shared_fonts=self.shared_fonts)
         return line_buffer, styles_stack
 
+    def page_chunks(self):
+        """
+        Splits the pages of the document in chunks for the page workers.
+
+        :return: a list of lists of (zero-based) page numbers, a single chunk when the document has less than
+        min_pages pages.
+        """
+        from math import ceil
+        from pdfminer.pdfdocument import PDFDocument
+        from pdfminer.pdfpage import PDFPage
+        from pdfminer.pdfparser import PDFParser
+
+        with open(self.document, 'rb') as fp:
+            page_count = sum(1 for _ in PDFPage.create_pages(PDFDocument(PDFParser(fp))))
+        if page_count < self.min_pages:
+            return [list(range(page_count))]
+        pages_per_chunk = self.pages_per_chunk
+        if pages_per_chunk is None:
+            # twice as many chunks as workers, so that a worker finishing early can take another one
+            pages_per_chunk = max(self.MIN_PAGES_PER_CHUNK, ceil(page_count / (2 * self.page_workers)))
+        return [list(range(start, min(start + pages_per_chunk, page_count)))
+                for start in range(0, page_count, pages_per_chunk)]
+
     def parse(self, map=None, use_cache=False, verbose=False):
         """
         Parses the document and returns a Document class containing the sections, sentences and titles.
@@ -199,4 +223,138 @@ class DocumentParser:
         return document
 
     def get_cached(self):
-        return self.cached_line, self.cached_styles
\ No newline at end of file
+        return self.cached_line, self.cached_styles
+
+
+def append_annotation(line_buffer, char_counter, token):
+    """
+    Applies a layout annotation (a space or a line break inserted by pdfminer) to the text extracted so far. A line
+    ending with a hyphen is joined to the next one by replacing the hyphen with a space.
+
+    :param line_buffer: the text extracted so far.
+    :param char_counter: the character counter used for the style offsets.
+    :param token: the text of the annotation.
+    :return: the updated text and character counter.
+    """
+    if token == ' ' and line_buffer[-1:] != ' ':
+        line_buffer += ' '
+        char_counter += 1
+    elif token == '\n':
+        if len(line_buffer) > 1 and line_buffer[-1:] == '-':
+            line_buffer = line_buffer.rstrip(line_buffer[-1]) + ' '
+        elif line_buffer[-1:] != ' ':
+            line_buffer += ' '
+            char_counter += 1
+    return line_buffer, char_counter
+
+
+def extract_text_segment(document, page_numbers=None, verbose=False, defer_leading=False, shared_fonts=False,
+                         context=None):
+    """
+    Extracts the text and the styles of some pages of a PDF document. The style offsets are local to the segment.
+
+    :param document: the path to the PDF document.
+    :param page_numbers: the (zero-based) numbers of the pages to extract, all of them when None.
+    :param verbose: print additional process information or not.
+    :param defer_leading: keep the hyphens and annotations met before the first other character instead of adding
+    them to the text, their effect depends on the end of the previous segment (see stitch_text_segments). The character
+    counter includes the deferred hyphens but not the deferred annotations.
+    :param shared_fonts: extract with the ExtractionContext of the current process, which keeps the fonts of the
+    documents it has already extracted, instead of a fresh pdfminer context.
+    :param context: the ExtractionContext to use, overrides shared_fonts.
+    :return: the text, the styles, the final character counter and the deferred (token, is_annotation) pairs of the
+    segment.
+    """
+    from pdfminer.layout import LTTextBoxHorizontal, LTTextLine, LTChar
+    from pdfminer.high_level import extract_pages
+    from .extraction import worker_context
+
+    if context is None and shared_fonts:
+        context = worker_context()
+    if context is not None:
+        pages = context.extract_pages(document, page_numbers=page_numbers)
+    else:
+        pages = extract_pages(document, page_numbers=page_numbers)
+    line_buffer = ''
+    styles_stack = []
+    leading_tokens = []
+    current_style = None
+    char_counter = 0
+    for page in pages:  # Hope you like indented code
+        for container in page:
+            if isinstance(container, LTTextBoxHorizontal):
+                for line in container:
+                    if isinstance(line, LTTextLine):
+                        for char in line:
+                            if isinstance(char, LTChar):
+                                token = char.get_text().replace('\xa0', '').replace('\xad', '')
+                                if token in DocumentParser.SUPPORTED_LIGATURES.keys():
+                                    token = token.translate(DocumentParser.SUPPORTED_LIGATURES)
+                                    char_counter += 1
+                                if current_style is None:
+                                    current_style = {}
+                                if 'name' not in current_style.keys():
+                                    current_style['name'] = char.fontname
+                                    current_style['start'] = char_counter
+                                elif char.fontname != current_style['name'] and token != ' ':
+                                    current_style['end'] = char_counter
+                                    if verbose:
+                                        print(line_buffer[current_style['start']:current_style['end']],
+                                              current_style)
+                                    styles_stack.append(current_style)
+                                    current_style = {'name': char.fontname, 'start': char_counter}
+                                if len(token) > 0:
+                                    if defer_leading and len(line_buffer) == 0 and token.strip('-') == '':
+                                        leading_tokens.append((token, False))
+                                    else:
+                                        line_buffer += token
+                                    char_counter += 1
+                            elif isinstance(char, LTAnno):
+                                token = char.get_text().replace('\xa0', '').replace('\xad', '')
+                                if token in DocumentParser.SUPPORTED_LIGATURES.keys():
+                                    token = token.translate(DocumentParser.SUPPORTED_LIGATURES)
+                                    char_counter += 1
+                                if defer_leading and len(line_buffer) == 0:
+                                    leading_tokens.append((token, True))
+                                else:
+                                    line_buffer, char_counter = append_annotation(line_buffer, char_counter, token)
+                current_style['end'] = char_counter
+                if verbose:
+                    print(line_buffer[current_style['start']:current_style['end']],
+                          current_style)
+                styles_stack.append(current_style)
+                current_style = None
+    return line_buffer, styles_stack, char_counter, leading_tokens
+
+
+def stitch_text_segments(segments):
+    """
+    Joins text segments extracted separately into the text and styles that a single pass over their pages gives.
+
+    :param segments: the results of extract_text_segment for consecutive chunks of pages, in order.
+    :return: the text of the document and the list of styles with their start and end offsets in the text.
+    """
+    line_buffer = ''
+    styles_stack = []
+    char_counter = 0
+    for text, styles, counter, leading_tokens in segments:
+        # the hyphens and annotations before the first other character of a segment depend on how the previous
+        # segment ended, e.g. a line break after a hyphen removes all the trailing hyphens of the text, so they are
+        # replayed here and each annotation shifts the offsets of the segment that come after it
+        position = 0
+        shifts = [(position, char_counter)]
+        for token, annotation in leading_tokens:
+            if annotation:
+                line_buffer, char_counter = append_annotation(line_buffer, char_counter, token)
+                shifts.append((position, char_counter - position))
+            else:
+                line_buffer += token
+                char_counter += 1
+                position += 1
+        for style in styles:
+            start, end = (offset + next(shift for after, shift in reversed(shifts) if after <= offset)
+                          for offset in (style['start'], style['end']))
+            styles_stack.append(dict(style, start=start, end=end))
+        line_buffer += text
+        char_counter += counter - position
+    return line_buffer, styles_stack
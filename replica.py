@@ -0,0 +1,157 @@
+import argparse
+
+
+def init_arguments():
+    parser = argparse.ArgumentParser(prog='replica', description='Parses PDF files and screens them for criteria')
+    subparsers = parser.add_subparsers(dest='command', metavar='{parse,screen,run,distill}', required=True)
+
+    parse = subparsers.add_parser('parse', help='Parses PDF files into documents, same as parser.py')
+    parse.add_argument('-v', '--verbose', help='Use this if you want the program to yell what it is doing',
+                       action='store_true')
+    parse.add_argument('-in', '--input', help='Input content to parse, if it is a folder all its content '
+                                              + 'will be parsed', type=str, action='store', required=True)
+    parse.add_argument('-o', '--output', help='The output path to store the content eventually generated',
+                       type=str, action='store')
+    parse.add_argument('-m', '--map', help='The style map file to use to recognise the content',
+                       type=str, action='store', required=True)
+    parse.add_argument('--no-check', help='Prevents end check process from running',
+                       dest='check', default=True, action='store_false')
+    parse.add_argument('-pw', '--page_workers', help='The number of processes extracting the pages of each document, '
+                                                     + 'useful for very large PDFs', type=int, default=1,
+                       action='store')
+    parse.add_argument('-sf', '--shared_fonts', help='Reuse the fonts parsed in the previous documents, only useful '
+                                                     + 'when the PDFs embed identical (not subset) fonts',
+                       default=False, action='store_true')
+    parse.add_argument('-mp', '--min_pages', help='Documents with fewer pages are not split between the page workers',
+                       type=int, default=50, action='store')
+
+    screen = subparsers.add_parser('screen', help='Screens parsed documents for criteria, same as criteria_screener.py')
+    screen.add_argument('-f', '--filepath', help='The path containing the output of the PDF parser',
+                        type=str, action='store', required=True)
+    screen.add_argument('-o', '--output', help='The output path to store the predictions, stores in output/ by default',
+                        type=str, default='output', action='store')
+    screen.add_argument('-ns', '--no_similarity', help='Disables BERTScore similarity matching to filter sentences',
+                        default=True, action='store_false')
+    screen.add_argument('-nc', '--no_classifier', help='Disables zero-shot text classifier',
+                        default=True, action='store_false')
+    screen.add_argument('-st', '--student', help='Screens with this distilled student model instead of the '
+                                                 + 'similarity filter and zero-shot classifier', type=str, action='store')
+
+    run = subparsers.add_parser('run', help='Parses PDF files and screens the documents in the same process')
+    run.add_argument('-v', '--verbose', help='Use this if you want the program to yell what it is doing',
+                     action='store_true')
+    run.add_argument('-in', '--input', help='Input content to parse, if it is a folder all its content '
+                                            + 'will be parsed', type=str, action='store', required=True)
+    run.add_argument('-m', '--map', help='The style map file to use to recognise the content',
+                     type=str, action='store', required=True)
+    run.add_argument('-o', '--output', help='The output path to store the predictions, stores in output/ by default',
+                     type=str, default='output', action='store')
+    run.add_argument('-po', '--parsed_output', help='Also store the parsed documents in this path',
+                     type=str, action='store')
+    run.add_argument('--no-check', help='Prevents end check process from running',
+                     dest='check', default=True, action='store_false')
+    run.add_argument('-pw', '--page_workers', help='The number of processes extracting the pages of each document, '
+                                                   + 'useful for very large PDFs', type=int, default=1,
+                     action='store')
+    run.add_argument('-sf', '--shared_fonts', help='Reuse the fonts parsed in the previous documents, only useful '
+                                                   + 'when the PDFs embed identical (not subset) fonts',
+                     default=False, action='store_true')
+    run.add_argument('-mp', '--min_pages', help='Documents with fewer pages are not split between the page workers',
+                     type=int, default=50, action='store')
+    run.add_argument('-ns', '--no_similarity', help='Disables BERTScore similarity matching to filter sentences',
+                     default=True, action='store_false')
+    run.add_argument('-nc', '--no_classifier', help='Disables zero-shot text classifier',
+                     default=True, action='store_false')
+    run.add_argument('-st', '--student', help='Screens with this distilled student model instead of the '
+                                              + 'similarity filter and zero-shot classifier', type=str, action='store')
+
+    distill = subparsers.add_parser('distill', help='Trains a fast student model on the results of the screener')
+    distill.add_argument('-f', '--filepath', help='The path containing the output of the PDF parser',
+                         type=str, action='store', required=True)
+    distill.add_argument('-t', '--teacher', help='The sentences.parquet written by the screener on these documents',
+                         type=str, action='store', required=True)
+    distill.add_argument('-o', '--output', help='The path of the student model, the agreement report is written next '
+                                                + 'to it', type=str, default='models/student.npz', action='store')
+    distill.add_argument('-e', '--encoder', help='The transformers model used to embed the sentences',
+                         type=str, default='distilbert-base-uncased', action='store')
+    distill.add_argument('-ho', '--holdout', help='The fraction of papers kept aside to measure the agreement',
+                         type=float, default=0.2, action='store')
+    distill.add_argument('--epochs', help='The number of training steps of the student',
+                         type=int, default=300, action='store')
+    args = parser.parse_args()
+    return args
+
+
+def load_parser_script():
+    """
+    Loads the functions of parser.py. It cannot be imported as a module since Python < 3.10 ships a built-in module
+    with the same name, which takes precedence.
+
+    :return: a dict with the globals of parser.py, its __main__ block is not executed.
+    """
+    from os.path import dirname, join, abspath
+    from runpy import run_path
+
+    return run_path(join(dirname(abspath(__file__)), 'parser.py'))
+
+
+def parse_documents(args):
+    """
+    Parses the PDF files and runs the correction process unless disabled, as parser.py does.
+
+    :param args: the parsed command line arguments.
+    :return: the list of parsed documents and the parser script functions.
+    """
+    script = load_parser_script()
+    documents, parsers = script['start_parsing'](args.input, args.map, args.verbose, args.page_workers,
+                                                 args.min_pages, args.shared_fonts)
+    map = args.map
+    correct = args.check
+    while correct:
+        print('Checking for parsing issues...')
+        documents, parsers, map, correct = script['start_correction_process'](args.input, map, documents, parsers)
+    return documents, script
+
+
+def parse(args):
+    documents, script = parse_documents(args)
+    if args.output is not None:
+        print('Saving documents')
+        script['save_parsing_results'](documents, args.output)
+
+
+def screen(args):
+    from criteria_screener import check_criteria
+
+    check_criteria(filepath=args.filepath, use_sim_score=args.no_similarity, use_zero_shot_classifier=args.no_classifier,
+                   output=args.output, student=args.student)
+
+
+def run(args):
+    from criteria_screener import document_to_sent, screen_papers
+
+    documents, script = parse_documents(args)
+    if args.parsed_output is not None:
+        print('Saving documents')
+        script['save_parsing_results'](documents, args.parsed_output)
+
+    # the documents go to the screener as they are, without being written and read back as json. They are named after
+    # the json file the parser would write, as screen names them, so both give the same paper titles
+    papers = ((document.name + '.json', document_to_sent(document)) for document in documents)
+    screen_papers(papers, use_sim_score=args.no_similarity, use_zero_shot_classifier=args.no_classifier,
+                  output=args.output, student=args.student)
+
+
+def distill(args):
+    from pandas import option_context
+    from screening.student import distill
+
+    report = distill(args.filepath, args.teacher, args.output, model_name=args.encoder, holdout=args.holdout,
+                     epochs=args.epochs)
+    with option_context('display.max_columns', None, 'display.width', 200):
+        print(report)
+
+
+if __name__ == '__main__':
+    args = init_arguments()
+    {'parse': parse, 'screen': screen, 'run': run, 'distill': distill}[args.command](args)
@@ -0,0 +1,186 @@
+import numpy as np
+
+
+class ScreeningResults:
+    """
+    This class stores the sentence-level results of a screening run in preallocated columns. The papers, criteria,
+    sentences and labels are kept once in dictionaries and the rows only hold their integer ids, so that the same
+    title and criterion strings are not repeated on every row.
+
+    Attributes
+    ----------
+
+    criteria: list
+        the names of the criteria, the position of a criterion in the list is its id.
+    titles: list
+        the titles of the papers, the position of a title in the list is the id of the paper.
+    sentences: list
+        the distinct sentences written in the rows, the position of a sentence in the list is its id. The other
+        sentences of the papers are not kept.
+    labels: list
+        the distinct zero-shot labels, the position of a label in the list is its id.
+    best: list
+        for each paper, the highest score of each criterion, including the scores of the rows that were not stored.
+
+    Methods
+    _______
+
+    add_paper(title, sentences)
+        Registers the paper being screened and its sentences, returns the id of the paper. The titles must be unique.
+    add(paper_id, criterion_id, indices, sim_scores, max_label_scores, top_labels, min_score)
+        Appends the results of one criterion for the paper being screened.
+    predictions(threshold)
+        Computes the paper x criterion prediction matrix.
+    write(output, threshold)
+        Writes predictions.csv and sentences.parquet in the output folder.
+    """
+
+    def __init__(self, criteria, capacity=4096):
+        """
+        :param criteria: the names of the criteria checked.
+        :param capacity: the initial number of rows allocated, the columns double in size when they are full.
+        """
+        self.criteria = list(criteria)
+        self.titles = []
+        self._title_ids = {}
+        self.sentences = []
+        self.labels = []
+        self._sentence_ids = {}
+        self._label_ids = {}
+        self.best = []
+        self._paper = None
+        self._paper_sentences = []
+        self.size = 0
+        self.paper_id = np.empty(capacity, dtype=np.int32)
+        self.criterion_id = np.empty(capacity, dtype=np.int16)
+        self.sentence_id = np.empty(capacity, dtype=np.int32)
+        self.label_id = np.empty(capacity, dtype=np.int32)
+        self.sim_score = np.empty(capacity, dtype=np.float32)
+        self.max_label_score = np.empty(capacity, dtype=np.float32)
+
+    def _reserve(self, rows):
+        capacity = len(self.paper_id)
+        if self.size + rows <= capacity:
+            return
+        while capacity < self.size + rows:
+            capacity *= 2
+        for column in ['paper_id', 'criterion_id', 'sentence_id', 'label_id', 'sim_score', 'max_label_score']:
+            values = getattr(self, column)
+            resized = np.empty(capacity, dtype=values.dtype)
+            resized[:self.size] = values[:self.size]
+            setattr(self, column, resized)
+
+    @staticmethod
+    def _intern(values, ids, value):
+        value_id = ids.get(value)
+        if value_id is None:
+            value_id = ids[value] = len(values)
+            values.append(value)
+        return value_id
+
+    def add_paper(self, title, sentences):
+        """
+        Registers the paper being screened and its sentences. The sentences of the previous paper are released, only
+        the sentences written in its rows are kept.
+
+        :param title: the title of the paper, it identifies the paper in the outputs and must be unique.
+        :param sentences: the list of sentences of the paper.
+        :return: the id of the paper.
+        """
+        if title in self._title_ids:
+            raise ValueError('two papers are titled {title}, the titles of the papers must be unique'.format(
+                title=title))
+        self._title_ids[title] = len(self.titles)
+        self.titles.append(title)
+        self.best.append(np.full(len(self.criteria), -np.inf, dtype=np.float32))
+        self._paper = len(self.titles) - 1
+        self._paper_sentences = sentences
+        return self._paper
+
+    def add(self, paper_id, criterion_id, indices, sim_scores, max_label_scores, top_labels=None, min_score=None):
+        """
+        Appends the results of one criterion for one paper. All the scores count for the predictions, but with
+        min_score only the rows scoring at least min_score are stored.
+
+        :param paper_id: the id of the paper being screened, as returned by the last call to add_paper.
+        :param criterion_id: the position of the criterion in the criteria list.
+        :param indices: the positions, in the sentences of the paper, of the sentences kept by the similarity filter.
+        :param sim_scores: the similarity scores of the kept sentences.
+        :param max_label_scores: the scores compared against the threshold for the kept sentences.
+        :param top_labels: the most likely zero-shot label of every kept sentence, None without classifier.
+        :param min_score: the lowest score of the rows stored, all the rows are stored when None.
+        """
+        if paper_id != self._paper:
+            raise ValueError('the results of paper {paper_id} are added after the next paper was registered, the '
+                             'papers must be screened one after the other'.format(paper_id=paper_id))
+        max_label_scores = np.broadcast_to(np.asarray(max_label_scores, dtype=np.float32), len(indices))
+        if len(indices) > 0:
+            self.best[paper_id][criterion_id] = max(self.best[paper_id][criterion_id], max_label_scores.max())
+        if min_score is not None:
+            stored = np.flatnonzero(max_label_scores >= min_score)
+            indices = np.asarray(indices)[stored]
+            sim_scores = np.broadcast_to(np.asarray(sim_scores, dtype=np.float32), len(max_label_scores))[stored]
+            max_label_scores = max_label_scores[stored]
+            if top_labels is not None:
+                top_labels = [top_labels[row] for row in stored]
+        rows = len(indices)
+        self._reserve(rows)
+        start, end = self.size, self.size + rows
+        self.paper_id[start:end] = paper_id
+        self.criterion_id[start:end] = criterion_id
+        for row, index in enumerate(indices, start):
+            self.sentence_id[row] = self._intern(self.sentences, self._sentence_ids, self._paper_sentences[index])
+        self.sim_score[start:end] = sim_scores
+        self.max_label_score[start:end] = max_label_scores
+        if top_labels is None:
+            self.label_id[start:end] = -1
+        else:
+            for row, label in enumerate(top_labels, start):
+                self.label_id[row] = self._intern(self.labels, self._label_ids, label)
+        self.size = end
+
+    def predictions(self, threshold):
+        """
+        Computes the predictions: a paper satisfies a criterion if any of its sentences crosses the threshold.
+
+        :param threshold: the threshold probability, or an array with one threshold per criterion.
+        :return: an int8 matrix with one row per paper and one column per criterion.
+        """
+        # the (paper, criterion) max of the scores is kept by add, before the rows are filtered
+        best = np.array(self.best, dtype=np.float32).reshape(len(self.titles), len(self.criteria))
+        return (best > threshold).astype(np.int8)
+
+    def to_frame(self):
+        """
+        Builds the sentence-level dataframe, the strings are stored as categorical columns over the dictionaries.
+
+        :return: a pandas DataFrame with columns criteria, sentences, sim_scores, label, paper_title, max_label_score.
+        """
+        import pandas as pd
+
+        return pd.DataFrame({
+            'criteria': pd.Categorical.from_codes(self.criterion_id[:self.size], categories=self.criteria),
+            'sentences': pd.Categorical.from_codes(self.sentence_id[:self.size], categories=self.sentences),
+            'sim_scores': self.sim_score[:self.size],
+            'label': pd.Categorical.from_codes(self.label_id[:self.size], categories=self.labels),
+            'paper_title': pd.Categorical.from_codes(self.paper_id[:self.size], categories=self.titles),
+            'max_label_score': self.max_label_score[:self.size],
+        })
+
+    def write(self, output, threshold):
+        """
+        Writes predictions.csv, with one column for each criteria and paper title, and sentences.parquet with the
+        sentence-level results (see to_frame).
+
+        :param output: the output folder, created if needed.
+        :param threshold: the threshold probability used for the predictions, or one per criterion.
+        """
+        from os import makedirs
+        from os.path import join
+        import pandas as pd
+
+        makedirs(output, exist_ok=True)
+        predictions = pd.DataFrame(self.predictions(threshold), columns=self.criteria)
+        predictions['paper_title'] = self.titles
+        predictions.to_csv(join(output, "predictions.csv"))
+        self.to_frame().to_parquet(join(output, "sentences.parquet"), index=False)
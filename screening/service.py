@@ -0,0 +1,264 @@
+import asyncio
+
+
+def _parse_pdf(content, name, map):
+    """
+    Parses the bytes of a PDF in a worker process and splits it into sentences.
+
+    :param content: the raw bytes of the PDF file.
+    :param name: the name to give to the document.
+    :param map: the style map (list of dicts) used to recognise the titles.
+    :return: the name of the document and its list of sentences.
+    """
+    from os import remove
+    from tempfile import NamedTemporaryFile
+    from criteria_screener import document_to_sent
+    from parsing.parsers import DocumentParser
+
+    with NamedTemporaryFile(suffix='.pdf', delete=False) as f:
+        f.write(content)
+    try:
+        document = DocumentParser(f.name, map).parse()
+    finally:
+        remove(f.name)
+    return name, document_to_sent(document)
+
+
+def _parse_json(content):
+    """
+    Reads a parsed document sent as json in a worker process and splits it into sentences.
+
+    :param content: the raw bytes of the json document, as written by the PDF parser.
+    :return: the name of the document (None if it has none) and its list of sentences.
+    """
+    from json import loads
+    from criteria_screener import data_to_sent
+
+    data = loads(content)
+    return data.get('name'), data_to_sent(data)
+
+
+class ScreeningService:
+    """
+    This class represents a long-running screening service. The models are loaded once, and the papers submitted
+    concurrently are grouped in shared model batches, so that each batch pays for one similarity scoring and one
+    zero-shot classification per criterion whatever the number of papers in it.
+
+    Attributes
+    ----------
+
+    map: list
+        the style map used to parse the PDFs sent to the service, PDFs are refused when it is None.
+    batch_window: float
+        the time (in seconds) to wait for other papers once a first one has been submitted.
+    max_batch_size: int
+        the maximum number of papers screened in one batch.
+    classifier_batch_size: int
+        the number of (sentence, label) pairs going through the NLI model together.
+
+    Methods
+    _______
+
+    screen(title, sentences)
+        Submits the sentences of a paper and waits for its per-criterion predictions and evidence sentences.
+    screen_batch(papers)
+        Screens a list of papers together, this is what runs in the model thread.
+    serve(host, port, socket)
+        Serves the screening over HTTP on a local TCP port or on a Unix socket.
+    """
+
+    def __init__(self, use_sim_score=True, use_zero_shot_classifier=True, map=None, batch_window=0.02,
+                 max_batch_size=32, classifier_batch_size=32, parse_workers=None):
+        """
+        :param use_sim_score: use the BERTScore similarity filter or not.
+        :param use_zero_shot_classifier: use the zero-shot classifier or not.
+        :param map: the style map (list of dicts) used to parse the PDFs sent to the service.
+        :param batch_window: the time (in seconds) to wait for other papers before running a batch.
+        :param max_batch_size: the maximum number of papers screened in one batch.
+        :param classifier_batch_size: the number of (sentence, label) pairs going through the NLI model together,
+        the sentences of all the papers of a batch share these forward passes.
+        :param parse_workers: the number of processes used to parse PDFs, defaults to the number of cores.
+        """
+        from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+        from multiprocessing import get_context
+        from criteria_screener import load_models
+
+        assert (
+                use_sim_score is not False or use_zero_shot_classifier is not False
+            ), "Either of use_sim_score or use_zero_shot_classifier should be True"
+
+        self.groundtruth, self.threshold, self.scorer, self.classifier = load_models(use_sim_score,
+                                                                                     use_zero_shot_classifier)
+        self.map = map
+        self.batch_window = batch_window
+        self.max_batch_size = max_batch_size
+        self.classifier_batch_size = classifier_batch_size
+        # the models are not thread-safe, a single thread runs all the batches one after another
+        self._model_executor = ThreadPoolExecutor(max_workers=1)
+        # forking next to the model thread can deadlock the workers, hence spawn
+        self._parse_executor = ProcessPoolExecutor(max_workers=parse_workers, mp_context=get_context('spawn'))
+        self._queue = None
+
+    def screen_batch(self, papers):
+        """
+        Screens a list of papers together, the sentences of all the papers are scored in one batch per criterion.
+
+        :param papers: a list of (title, sentences) tuples.
+        :return: a list with, for each paper, a dict with the paper title, the predictions (0 or 1) per criterion and
+                 the evidence sentences per criterion with their similarity and label scores.
+        """
+        from criteria_screener import score_criterion, THRESHOLD_PROB
+
+        sentences = []
+        owners = []
+        results = []
+        for i, (title, paper_sentences) in enumerate(papers):
+            sentences.extend(paper_sentences)
+            owners.extend([i]*len(paper_sentences))
+            results.append({'paper_title': title, 'predictions': {}, 'evidence': {}})
+
+        for key in self.groundtruth["zero_shot"][0]:
+            for result in results:
+                result['predictions'][key] = 0
+                result['evidence'][key] = []
+            indices, sim_scores, max_label_scores, top_labels = score_criterion(
+                sentences, key, self.groundtruth, self.threshold, scorer=self.scorer, classifier=self.classifier,
+                batch_size=self.classifier_batch_size)
+            if top_labels is None:
+                top_labels = [None]*len(indices)
+            for i, sim_score, max_label_score, label in zip(indices, sim_scores, max_label_scores, top_labels):
+                # same rule as the batch screener, a sentence crossing the threshold probability marks the paper
+                if max_label_score > THRESHOLD_PROB:
+                    result = results[owners[i]]
+                    result['predictions'][key] = 1
+                    result['evidence'][key].append({'sentence': sentences[i], 'label': label,
+                                                    'sim_score': float(sim_score),
+                                                    'max_label_score': float(max_label_score)})
+        return results
+
+    async def screen(self, title, sentences):
+        """
+        Submits the sentences of a paper to the next batch and waits for its results.
+
+        :param title: the title of the paper.
+        :param sentences: the list of sentences of the paper.
+        :return: the dict of results of the paper, see screen_batch.
+        """
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((title, sentences, future))
+        return await future
+
+    async def _batch_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.batch_window
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            # papers submitted while the models run wait in the queue and make up the next batch
+            try:
+                results = await loop.run_in_executor(self._model_executor, self.screen_batch,
+                                                     [(title, sentences) for title, sentences, _ in batch])
+            except Exception as e:
+                for _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for (_, _, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+    async def _route(self, method, path, headers, body):
+        from pdfminer.psparser import PSException
+
+        if method == 'GET' and path == '/health':
+            return 200, {'status': 'ok', 'queued': self._queue.qsize()}
+        if method != 'POST' or path != '/screen':
+            return 404, {'error': 'unknown endpoint {method} {path}'.format(method=method, path=path)}
+
+        content_type = headers.get('content-type', '').split(';')[0].strip()
+        loop = asyncio.get_running_loop()
+        # parsing and sentence splitting run in the worker processes, the loop keeps accepting papers meanwhile
+        try:
+            if content_type == 'application/pdf':
+                if self.map is None:
+                    return 400, {'error': 'the service was started without a map, it cannot parse PDFs'}
+                name, sentences = await loop.run_in_executor(self._parse_executor, _parse_pdf, body,
+                                                             headers.get('x-paper-title', 'document.pdf'), self.map)
+            elif content_type == 'application/json':
+                name, sentences = await loop.run_in_executor(self._parse_executor, _parse_json, body)
+            else:
+                return 415, {'error': 'expected application/json or application/pdf, got {type}'.format(
+                    type=content_type)}
+        except (ValueError, KeyError, TypeError, AttributeError, PSException) as e:
+            return 400, {'error': 'could not read the document: {error}'.format(error=e)}
+
+        return 200, await self.screen(headers.get('x-paper-title', name), sentences)
+
+    async def handle(self, reader, writer):
+        """
+        Handles one HTTP request, the connection is closed once the response is sent.
+
+        :param reader: the asyncio stream reader of the connection.
+        :param writer: the asyncio stream writer of the connection.
+        """
+        from http import HTTPStatus
+        from json import dumps
+
+        try:
+            request_line = await reader.readline()
+            method, path, _ = request_line.decode('latin-1').split(' ', 2)
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b'\r\n', b'\n', b''):
+                    break
+                name, _, value = line.decode('latin-1').partition(':')
+                headers[name.strip().lower()] = value.strip()
+            body = await reader.readexactly(int(headers.get('content-length', 0)))
+        except (ValueError, asyncio.IncompleteReadError) as e:
+            status, payload = 400, {'error': 'malformed request: {error}'.format(error=e)}
+        else:
+            try:
+                status, payload = await self._route(method, path.split('?')[0], headers, body)
+            except Exception as e:
+                status, payload = 500, {'error': str(e)}
+
+        content = dumps(payload).encode('utf8')
+        writer.write('HTTP/1.1 {status} {reason}\r\nContent-Type: application/json\r\nContent-Length: {length}\r\n'
+                     'Connection: close\r\n\r\n'.format(status=status, reason=HTTPStatus(status).phrase,
+                                                        length=len(content)).encode('latin-1'))
+        writer.write(content)
+        try:
+            await writer.drain()
+        finally:
+            writer.close()
+
+    async def serve(self, host='127.0.0.1', port=8000, socket=None):
+        """
+        Starts the batching loop and serves the screening until cancelled.
+
+        :param host: the address to listen on, localhost by default.
+        :param port: the TCP port to listen on.
+        :param socket: the path of a Unix socket to listen on instead of the TCP port.
+        """
+        self._queue = asyncio.Queue()
+        batcher = asyncio.create_task(self._batch_loop())
+        if socket is not None:
+            server = await asyncio.start_unix_server(self.handle, path=socket)
+        else:
+            server = await asyncio.start_server(self.handle, host, port)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            batcher.cancel()
+            self._model_executor.shutdown(wait=False)
+            self._parse_executor.shutdown(wait=False)
@@ -0,0 +1,357 @@
+import numpy as np
+
+# same encoder as the BERTScore similarity filter
+DEFAULT_ENCODER = 'distilbert-base-uncased'
+
+
+def sigmoid(x):
+    return np.exp(-np.logaddexp(0, -x))
+
+
+def cohen_kappa(a, b):
+    """
+    Computes Cohen's kappa between two binary ratings.
+
+    :param a: the first array of booleans.
+    :param b: the second array of booleans.
+    :return: the kappa, 1 when both ratings are identical and constant.
+    """
+    agreement = np.mean(a == b)
+    chance = np.mean(a) * np.mean(b) + (1 - np.mean(a)) * (1 - np.mean(b))
+    if chance == 1:
+        return 1.0
+    return float((agreement - chance) / (1 - chance))
+
+
+class SentenceEncoder:
+    """
+    This class represents a sentence encoder: the mean of the last hidden states of a transformers model over the
+    tokens of the sentence. Each sentence goes through the model once, whatever the number of criteria.
+
+    Attributes
+    ----------
+
+    model_name: str
+        the name of the transformers model.
+    batch_size: int
+        the number of sentences encoded together.
+    max_length: int
+        the maximum number of tokens of a sentence, longer sentences are truncated.
+
+    Methods
+    _______
+
+    encode(sentences)
+        Returns the embeddings of the sentences.
+    """
+
+    def __init__(self, model_name=DEFAULT_ENCODER, batch_size=64, max_length=128):
+        """
+        :param model_name: the name of the transformers model.
+        :param batch_size: the number of sentences encoded together.
+        :param max_length: the maximum number of tokens of a sentence.
+        """
+        import torch
+        from transformers import AutoModel, AutoTokenizer
+
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.max_length = max_length
+        self.device = 'cuda' if torch.cuda.is_available() else 'cpu'
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+        self.model = AutoModel.from_pretrained(model_name).to(self.device).eval()
+
+    def encode(self, sentences):
+        """
+        Returns the embeddings of the sentences.
+
+        :param sentences: the list of sentences.
+        :return: a float32 array with one row per sentence.
+        """
+        import torch
+
+        embeddings = np.zeros((len(sentences), self.model.config.hidden_size), dtype=np.float32)
+        with torch.no_grad():
+            for start in range(0, len(sentences), self.batch_size):
+                batch = self.tokenizer(sentences[start:start + self.batch_size], padding=True, truncation=True,
+                                       max_length=self.max_length, return_tensors='pt').to(self.device)
+                hidden = self.model(**batch).last_hidden_state
+                mask = batch['attention_mask'].unsqueeze(-1).to(hidden.dtype)
+                pooled = (hidden * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1)
+                embeddings[start:start + len(pooled)] = pooled.cpu().numpy()
+        return embeddings
+
+
+class StudentClassifier:
+    """
+    This class represents a multi-label student classifier distilled from the BERTScore + zero-shot pipeline: a
+    linear head over sentence embeddings giving, for every criterion, the probability that the pipeline marks the
+    sentence as positive.
+
+    Attributes
+    ----------
+
+    criteria: list
+        the names of the criteria, in the order of the columns of the head.
+    weights: numpy.ndarray
+        the weights of the head, one column per criterion.
+    bias: numpy.ndarray
+        the bias of the head.
+    thresholds: numpy.ndarray
+        the probability above which a sentence is positive, per criterion.
+    mean: numpy.ndarray
+        the mean of the training embeddings, used to standardize the embeddings.
+    scale: numpy.ndarray
+        the standard deviation of the training embeddings.
+    model_name: str
+        the name of the encoder model.
+
+    Methods
+    _______
+
+    fit(embeddings, targets, criteria, model_name)
+        Trains a student on the embeddings and the teacher's sentence labels.
+    predict_proba(sentences)
+        Returns the probabilities of every criterion for the sentences.
+    save(path) / load(path)
+        Stores or reads the student in a .npz file.
+    """
+
+    def __init__(self, criteria, weights, bias, thresholds, mean, scale, model_name=DEFAULT_ENCODER):
+        self.criteria = list(criteria)
+        self.weights = weights
+        self.bias = bias
+        self.thresholds = thresholds
+        self.mean = mean
+        self.scale = scale
+        self.model_name = model_name
+        self._encoder = None
+
+    @classmethod
+    def fit(cls, embeddings, targets, criteria, model_name=DEFAULT_ENCODER, epochs=300, learning_rate=1e-2, l2=1e-4):
+        """
+        Trains the linear head with a weighted logistic loss (positives are rare) and Adam, on the full batch.
+
+        :param embeddings: the sentence embeddings, one row per sentence.
+        :param targets: the teacher's labels, a boolean array with one row per sentence and one column per criterion.
+        :param criteria: the names of the criteria.
+        :param model_name: the name of the encoder model that produced the embeddings.
+        :param epochs: the number of gradient steps.
+        :param learning_rate: the learning rate of Adam.
+        :param l2: the L2 regularisation of the weights.
+        :return: an instance of StudentClassifier, with thresholds at 0.5.
+        """
+        mean = embeddings.mean(axis=0)
+        scale = embeddings.std(axis=0) + 1e-6
+        x = (embeddings - mean) / scale
+        y = targets.astype(np.float32)
+        n, d = x.shape
+        positives = y.sum(axis=0)
+        pos_weight = np.clip((n - positives) / np.maximum(positives, 1), 1, 100).astype(np.float32)
+        sample_weight = np.where(targets, pos_weight, np.float32(1)) / n
+
+        params = [np.zeros((d, len(criteria)), dtype=np.float32), np.zeros(len(criteria), dtype=np.float32)]
+        moments = [np.zeros_like(p) for p in params]
+        velocities = [np.zeros_like(p) for p in params]
+        beta1, beta2 = 0.9, 0.999
+        for step in range(1, epochs + 1):
+            error = sample_weight * (sigmoid(x @ params[0] + params[1]) - y)
+            gradients = [x.T @ error + l2 * params[0], error.sum(axis=0)]
+            for p, g, m, v in zip(params, gradients, moments, velocities):
+                m *= beta1
+                m += (1 - beta1) * g
+                v *= beta2
+                v += (1 - beta2) * g * g
+                p -= learning_rate * (m / (1 - beta1 ** step)) / (np.sqrt(v / (1 - beta2 ** step)) + 1e-8)
+
+        return cls(criteria, params[0], params[1], np.full(len(criteria), 0.5, dtype=np.float32), mean, scale,
+                   model_name)
+
+    def predict_proba_embeddings(self, embeddings):
+        """
+        :param embeddings: the sentence embeddings, one row per sentence.
+        :return: the probabilities, one row per sentence and one column per criterion.
+        """
+        return sigmoid(((embeddings - self.mean) / self.scale) @ self.weights + self.bias)
+
+    def predict_proba(self, sentences):
+        """
+        Encodes the sentences (once for all the criteria) and returns their probabilities.
+
+        :param sentences: the list of sentences.
+        :return: the probabilities, one row per sentence and one column per criterion.
+        """
+        if len(sentences) == 0:
+            return np.zeros((0, len(self.criteria)), dtype=np.float32)
+        if self._encoder is None:
+            self._encoder = SentenceEncoder(self.model_name)
+        return self.predict_proba_embeddings(self._encoder.encode(sentences))
+
+    def tune_thresholds(self, probabilities, labels, owners, papers, candidates=np.linspace(0.05, 0.95, 19)):
+        """
+        Picks, per criterion, the threshold giving the paper-level predictions closest (Cohen's kappa, then
+        agreement) to the teacher's, ties being broken by the sentence-level kappa.
+
+        :param probabilities: the probabilities of the training sentences.
+        :param labels: the teacher's labels of the training sentences.
+        :param owners: the paper index of every training sentence.
+        :param papers: the number of training papers.
+        :param candidates: the thresholds tried.
+        """
+        teacher_predictions = paper_predictions(labels, owners, papers)
+        for c in range(len(self.criteria)):
+            best = None
+            for threshold in candidates:
+                positives = probabilities[:, c:c + 1] > threshold
+                predictions = paper_predictions(positives, owners, papers)[:, 0]
+                score = (cohen_kappa(predictions, teacher_predictions[:, c]),
+                         np.mean(predictions == teacher_predictions[:, c]),
+                         cohen_kappa(positives[:, 0], labels[:, c]))
+                if best is None or score > best[0]:
+                    best = (score, threshold)
+            self.thresholds[c] = best[1]
+
+    def save(self, path):
+        np.savez(path, criteria=np.array(self.criteria), weights=self.weights, bias=self.bias,
+                 thresholds=self.thresholds, mean=self.mean, scale=self.scale, model_name=np.array(self.model_name))
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(data['criteria'].tolist(), data['weights'], data['bias'], data['thresholds'], data['mean'],
+                       data['scale'], str(data['model_name']))
+
+
+def paper_predictions(positives, owners, papers):
+    """
+    A paper satisfies a criterion if any of its sentences is positive.
+
+    :param positives: a boolean array with one row per sentence and one column per criterion.
+    :param owners: the paper index of every sentence.
+    :param papers: the number of papers.
+    :return: a boolean array with one row per paper and one column per criterion.
+    """
+    predictions = np.zeros((papers, positives.shape[1]), dtype=bool)
+    np.logical_or.at(predictions, owners, positives)
+    return predictions
+
+
+def teacher_labels(papers, teacher, criteria, threshold):
+    """
+    Builds the sentence labels of the teacher from the sentences.parquet written by the pipeline. The sentences
+    missing from it were discarded by the similarity filter and are negatives.
+
+    :param papers: a list of (title, sentences) pairs, the sentences as split by the screener.
+    :param teacher: the path to the sentences.parquet of the pipeline run on the same papers.
+    :param criteria: the names of the criteria.
+    :param threshold: the threshold probability of the pipeline.
+    :return: the papers screened by the teacher, and the boolean labels of their sentences (one row per sentence
+             of these papers, in order, and one column per criterion).
+    """
+    import pandas as pd
+
+    results = pd.read_parquet(teacher, columns=['paper_title', 'criteria', 'sentences', 'max_label_score'])
+    screened = set(results['paper_title'].astype(str).unique())
+    positives = results[results['max_label_score'] > threshold]
+    positives = set(zip(positives['paper_title'].astype(str), positives['criteria'].astype(str),
+                        positives['sentences'].astype(str)))
+
+    papers = [(title, sentences) for title, sentences in papers if title in screened]
+    labels = np.zeros((sum(len(sentences) for _, sentences in papers), len(criteria)), dtype=bool)
+    row = 0
+    for title, sentences in papers:
+        for sentence in sentences:
+            for c, key in enumerate(criteria):
+                labels[row, c] = (title, key, sentence) in positives
+            row += 1
+    return papers, labels
+
+
+def agreement_report(student, probabilities, labels, owners, papers):
+    """
+    Compares the student with the teacher, at the sentence and at the paper level.
+
+    :param student: the StudentClassifier, with its thresholds.
+    :param probabilities: the probabilities of the student for the sentences.
+    :param labels: the labels of the teacher for the sentences.
+    :param owners: the paper index of every sentence.
+    :param papers: the number of papers.
+    :return: a pandas DataFrame with one row per criterion and a last row for all the criteria together.
+    """
+    import pandas as pd
+
+    positives = probabilities > student.thresholds
+    student_papers = paper_predictions(positives, owners, papers)
+    teacher_papers = paper_predictions(labels, owners, papers)
+
+    rows = []
+    columns = [(key, [c]) for c, key in enumerate(student.criteria)] + [('all', list(range(len(student.criteria))))]
+    for key, c in columns:
+        s, t = positives[:, c].ravel(), labels[:, c].ravel()
+        sp, tp = student_papers[:, c].ravel(), teacher_papers[:, c].ravel()
+        rows.append({
+            'criteria': key,
+            'threshold': float(student.thresholds[c[0]]) if len(c) == 1 else None,
+            'teacher_papers': int(tp.sum()),
+            'student_papers': int(sp.sum()),
+            'paper_agreement': float(np.mean(sp == tp)),
+            'paper_kappa': cohen_kappa(sp, tp),
+            'sentence_precision': float((s & t).sum() / s.sum()) if s.sum() > 0 else None,
+            'sentence_recall': float((s & t).sum() / t.sum()) if t.sum() > 0 else None,
+        })
+    return pd.DataFrame(rows)
+
+
+def distill(filepath, teacher, output, model_name=DEFAULT_ENCODER, holdout=0.2, epochs=300, seed=0):
+    """
+    Trains a student on the pipeline's results over a corpus and reports its agreement with the pipeline on
+    held-out papers.
+
+    :param filepath: the folder containing the outputs of the PDF parser.
+    :param teacher: the sentences.parquet written by the pipeline on these documents.
+    :param output: the path of the .npz file to write the student to, the report is written next to it.
+    :param model_name: the name of the encoder model.
+    :param holdout: the fraction of papers kept aside to measure the agreement, strictly between 0 and 1.
+    :param epochs: the number of gradient steps.
+    :param seed: the seed of the split between training and held-out papers.
+    :return: the agreement report, see agreement_report.
+    """
+    from os import listdir, makedirs
+    from os.path import basename, dirname, join, splitext
+    from criteria_screener import json_to_sent, read_json, THRESHOLD_PROB
+
+    if not 0 < holdout < 1:
+        raise ValueError('the held-out fraction must be between 0 and 1 (excluded), got {holdout}'.format(
+            holdout=holdout))
+
+    criteria = list(read_json("util_files/criteria_groundtruth.json")["zero_shot"][0])
+    files = sorted(join(filepath, filename) for filename in listdir(filepath) if '.json' in filename)
+    papers = [(basename(json_file), json_to_sent(json_file)) for json_file in files]
+    papers, labels = teacher_labels(papers, teacher, criteria, THRESHOLD_PROB)
+    if len(papers) == 0:
+        raise ValueError('none of the documents in {filepath} appears in {teacher}, the teacher results must come '
+                         'from screening the same documents'.format(filepath=filepath, teacher=teacher))
+    owners = np.repeat(np.arange(len(papers)), [len(sentences) for _, sentences in papers])
+    print('Encoding {} sentences from {} papers'.format(len(owners), len(papers)))
+    embeddings = SentenceEncoder(model_name).encode([sentence for _, sentences in papers for sentence in sentences])
+
+    # the split is done by paper, so that the report measures the paper-level predictions on unseen papers
+    held_out = np.random.default_rng(seed).random(len(papers)) < holdout
+    train = ~held_out[owners]
+    if train.all() or not train.any():
+        raise ValueError('the split of the {papers} papers left no sentence to {split}, use more papers or another '
+                         'held-out fraction'.format(papers=len(papers), split='hold out' if train.all() else 'train on'))
+    train_owners = np.unique(owners[train], return_inverse=True)[1]
+    test_owners = np.unique(owners[~train], return_inverse=True)[1]
+
+    student = StudentClassifier.fit(embeddings[train], labels[train], criteria, model_name=model_name, epochs=epochs)
+    student.tune_thresholds(student.predict_proba_embeddings(embeddings[train]), labels[train], train_owners,
+                            int((~held_out).sum()))
+    if dirname(output):
+        makedirs(dirname(output), exist_ok=True)
+    student.save(output)
+
+    report = agreement_report(student, student.predict_proba_embeddings(embeddings[~train]), labels[~train],
+                              test_owners, int(held_out.sum()))
+    report.to_csv(splitext(output)[0] + '_agreement.csv', index=False)
+    return report
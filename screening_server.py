@@ -0,0 +1,48 @@
+import argparse
+
+
+def init_arguments():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--host', help='The address to listen on, only localhost by default',
+                        type=str, default='127.0.0.1', action='store')
+    parser.add_argument('-p', '--port', help='The TCP port to listen on',
+                        type=int, default=8000, action='store')
+    parser.add_argument('-u', '--socket', help='Listen on this Unix socket path instead of the TCP port',
+                        type=str, action='store')
+    parser.add_argument('-m', '--map', help='The style map file used to parse the PDFs sent to the service, '
+                                            + 'without it only parsed documents are accepted', type=str, action='store')
+    parser.add_argument('-w', '--batch_window', help='How long (in milliseconds) to wait for other papers before '
+                                                     + 'running a batch', type=float, default=20, action='store')
+    parser.add_argument('-b', '--max_batch', help='The maximum number of papers screened in one batch',
+                        type=int, default=32, action='store')
+    parser.add_argument('-cb', '--classifier_batch', help='The number of (sentence, label) pairs going through the '
+                                                          + 'zero-shot classifier together', type=int, default=32,
+                        action='store')
+    parser.add_argument('-ns', '--no_similarity', help='Disables BERTScore similarity matching to filter sentences',
+                        default=True, action='store_false')
+    parser.add_argument('-nc', '--no_classifier', help='Disables zero-shot text classifier',
+                        default=True, action='store_false')
+    args = parser.parse_args()
+    return args
+
+
+if __name__ == '__main__':
+    from asyncio import run
+    from json import load
+    from screening.service import ScreeningService
+
+    args = init_arguments()
+    map = None
+    if args.map is not None:
+        with open(args.map, 'r') as f:
+            map = load(f)
+
+    service = ScreeningService(use_sim_score=args.no_similarity, use_zero_shot_classifier=args.no_classifier,
+                               map=map, batch_window=args.batch_window / 1000, max_batch_size=args.max_batch,
+                               classifier_batch_size=args.classifier_batch)
+    print('Models loaded, listening on {address}'.format(
+        address=args.socket if args.socket is not None else '{}:{}'.format(args.host, args.port)))
+    try:
+        run(service.serve(host=args.host, port=args.port, socket=args.socket))
+    except KeyboardInterrupt:
+        pass